@@ -7,10 +7,10 @@ import json
 import numpy as np
 from typing import Dict, List, Optional, Tuple, Any, Union
 import warnings
+import logging
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
 import statsmodels.api as sm
-from statsmodels.tsa.seasonal import seasonal_decompose
 import plotly.figure_factory as ff
 from prophet import Prophet
 import pmdarima as pm
@@ -20,10 +20,16 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet
 from jinja2 import Template
 import base64
+import hashlib
+import io
 from pathlib import Path
 import os
-from scipy import stats
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 warnings.filterwarnings('ignore')
+logger = logging.getLogger(__name__)
 
 # Sayfa yapılandırması
 st.set_page_config(
@@ -33,6 +39,29 @@ st.set_page_config(
 )
 
 # Yardımcı fonksiyonlar
+def _hash_dataframe(df: pd.DataFrame) -> Tuple[Any, ...]:
+    """Önbellek anahtarı için DataFrame'in boyut, sütun ve satır hash'ini üretir."""
+    return (df.shape, tuple(df.columns), int(pd.util.hash_pandas_object(df, index=True).sum()))
+
+# DataFrame argümanı alan önbellekli fonksiyonlar için ortak ayar
+_DF_HASH_FUNCS = {pd.DataFrame: _hash_dataframe}
+
+# Her filtre kombinasyonu ayrı önbellek girdisidir; süreç belleği tüm oturumlarca paylaşıldığından sınırlanır
+ANALYSIS_CACHE_MAX_ENTRIES = 16
+# Eğitilmiş modeller ve tahmin sonuçları daha ağır olduğundan daha az tutulur
+MODEL_CACHE_MAX_ENTRIES = 8
+
+# Önbellekli bölümlerin kullandığı sütunlar; geniş dosyalarda hash ve kopya yalnızca bunlar için yapılır
+RFM_COLUMNS = ('musteri_id', 'tarih', 'satis_tutari', 'siparis_id')
+CATEGORY_ANALYSIS_COLUMNS = ('kategori', 'tarih', 'satis_tutari', 'miktar')
+PRODUCT_COLUMNS = ('urun_adi', 'tarih', 'miktar', 'satis_tutari')
+FORECAST_COLUMNS = ('tarih', 'satis_tutari')
+STOCK_COLUMNS = ('urun_adi', 'tarih', 'miktar')
+
+def _select_columns(df: pd.DataFrame, columns: Tuple[str, ...]) -> pd.DataFrame:
+    """Verilen sütunlardan çerçevede bulunanları seçer (isteğe bağlı sütunlar atlanır)."""
+    return df[[column for column in columns if column in df.columns]]
+
 def validate_dataframe(df: pd.DataFrame) -> Tuple[bool, str]:
     """Veri çerçevesinin gerekli sütunları içerip içermediğini kontrol eder."""
     required_columns = ['tarih', 'urun_adi', 'miktar', 'satis_tutari']
@@ -44,41 +73,138 @@ def validate_dataframe(df: pd.DataFrame) -> Tuple[bool, str]:
 
 def detect_and_convert_date(df: pd.DataFrame, date_column: str = 'tarih') -> pd.DataFrame:
     """Tarih sütununu otomatik olarak tespit edip dönüştürür."""
-    if date_column in df.columns:
+    if date_column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[date_column]):
         try:
-            # Farklı tarih formatlarını dene
+            # Farklı tarih formatlarını dene (saatli varyantlarıyla birlikte)
             date_formats = [
-                '%Y-%m-%d', '%d-%m-%Y', '%m-%d-%Y',
-                '%Y/%m/%d', '%d/%m/%Y', '%m/%d/%Y',
-                '%d.%m.%Y', '%Y.%m.%d'
+                date_format + time_format
+                for date_format in [
+                    '%Y-%m-%d', '%d-%m-%Y', '%m-%d-%Y',
+                    '%Y/%m/%d', '%d/%m/%Y', '%m/%d/%Y',
+                    '%d.%m.%Y', '%Y.%m.%d'
+                ]
+                for time_format in ['', ' %H:%M', ' %H:%M:%S']
             ]
             
-            for date_format in date_formats:
-                try:
-                    df[date_column] = pd.to_datetime(df[date_column], format=date_format)
-                    break
-                except:
-                    continue
+            raw_dates = df[date_column]
+            missing_count = raw_dates.isna().sum()
+            non_null = raw_dates.dropna()
+            sample = non_null.iloc[0] if len(non_null) > 0 else None
+            parsed = None
+            
+            # Formatı ilk dolu değer üzerinde dene, sütunu yalnızca uyan formatla dönüştür
+            if isinstance(sample, str):
+                for date_format in date_formats:
+                    try:
+                        datetime.strptime(sample.strip(), date_format)
+                    except ValueError:
+                        continue
+                    
+                    candidate = pd.to_datetime(raw_dates, format=date_format, errors='coerce', cache=True)
+                    if candidate.isna().sum() == missing_count:
+                        parsed = candidate
+                        break
             
             # Eğer yukarıdaki formatlar çalışmazsa, pandas'ın otomatik dönüşümünü dene
-            if not pd.api.types.is_datetime64_any_dtype(df[date_column]):
-                df[date_column] = pd.to_datetime(df[date_column])
+            if parsed is None:
+                parsed = pd.to_datetime(raw_dates, dayfirst=True, errors='coerce', cache=True)
+            
+            failed_count = parsed.isna().sum() - missing_count
+            if failed_count > 0:
+                st.warning(f"{failed_count} satırdaki tarih değeri dönüştürülemedi.")
+            
+            df[date_column] = parsed
                 
         except Exception as e:
             st.error(f"Tarih dönüşümünde hata: {str(e)}")
     
     return df
 
+# Gruplama anahtarı olarak kullanılan, kategoriye çevrilen sütunlar
+CATEGORY_COLUMNS = ('musteri_id', 'urun_adi', 'kategori')
+
+def _optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Tam sayı sütunlarını küçültür, gruplama anahtarlarını kategoriye çevirir."""
+    # Ondalıklı sütunlar (satış tutarı, boşluklu ID'ler) hassasiyet kaybı olmaması için float64 kalır
+    for column in df.select_dtypes('integer').columns:
+        if column != 'tarih':
+            df[column] = pd.to_numeric(df[column], downcast='integer')
+    
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    
+    return df
+
+def _category_mask(column: pd.Series, values: pd.Index) -> np.ndarray:
+    """Kategorik sütunda verilen değerlere denk gelen satırların maskesini kod tablosundan çıkarır."""
+    categories = column.cat.categories
+    # Son eleman eksik değerlerin (-1 kodu) düştüğü, her zaman False kalan yuvadır
+    keep = np.zeros(len(categories) + 1, dtype=bool)
+    indexer = categories.get_indexer(values)
+    keep[indexer[indexer >= 0]] = True
+    return keep[column.cat.codes.to_numpy()]
+
+def _sort_by_label(result: pd.DataFrame, column: pd.Series) -> pd.DataFrame:
+    """Kategorik gruplama sonucunu etiket sırasına dizer (observed=True görünme sırası döndürür)."""
+    # Sıra, kaynak sütunun (astype('category') ile sıralanmış) kategorilerinden alınır;
+    # etiketler karşılaştırılmadığı için sayı ve metin karışık ürün kodlarında da çalışır
+    positions = column.cat.categories.get_indexer(result.index)
+    return result.iloc[np.argsort(positions, kind='stable')]
+
+# Bellekte ayrıştırılmış hâli saklanan en fazla yüklenmiş dosya sayısı
+UPLOAD_CACHE_MAX_ENTRIES = 4
+
+# Bu boyutun üzerindeki CSV dosyaları PyArrow ile okunur
+PYARROW_CSV_MIN_BYTES = 5 * 1024 * 1024
+
+def _read_csv_arrow(buffer: io.BytesIO) -> pd.DataFrame:
+    """CSV'yi PyArrow ile okur; anahtar metin sütunları Python nesnesine dönüşmeden kategori olur."""
+    # Boş metin hücreleri, C ayrıştırıcısında olduğu gibi eksik değer sayılır
+    table = pa_csv.read_csv(buffer, convert_options=pa_csv.ConvertOptions(strings_can_be_null=True))
+    encoded = []
+    for column in CATEGORY_COLUMNS:
+        if column in table.column_names and pa.types.is_string(table.schema.field(column).type):
+            index = table.schema.get_field_index(column)
+            table = table.set_column(index, column, table.column(index).dictionary_encode())
+            encoded.append(column)
+    
+    # Dönüşüm sırasında Arrow tamponları serbest bırakılır, bellek tepe noktası düşer
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    del table
+    
+    # Kategoriler küçük dosyalardaki astype('category') ile aynı (sıralı) düzende olsun
+    for column in encoded:
+        df[column] = df[column].cat.reorder_categories(df[column].cat.categories.sort_values())
+    
+    return df
+
+# Ayrıştırılan dosyalar yalnızca bellekte tutulur (müşteri verisi diske yazılmaz); en fazla birkaç dosya
+@st.cache_data(show_spinner=False, max_entries=UPLOAD_CACHE_MAX_ENTRIES)
+def _read_uploaded_file(file_name: str, file_size: int, file_bytes: bytes) -> Optional[pd.DataFrame]:
+    """Yüklenen dosyanın içeriğini okur; aynı dosya için sonuç önbellekten döner."""
+    buffer = io.BytesIO(file_bytes)
+    if file_name.endswith('.csv'):
+        # Büyük CSV'ler PyArrow ile çok çekirdekte ayrıştırılır
+        if file_size > PYARROW_CSV_MIN_BYTES:
+            df = _read_csv_arrow(buffer)
+        else:
+            df = pd.read_csv(buffer)
+    elif file_name.endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(buffer)
+    elif file_name.endswith('.json'):
+        df = pd.read_json(buffer)
+    else:
+        return None
+    
+    # Tarih dönüşümü de önbellekte; her yeniden çalıştırmada değil, dosya başına bir kez yapılır
+    return detect_and_convert_date(_optimize_dtypes(df))
+
 def load_data(uploaded_file: Any) -> Optional[pd.DataFrame]:
     """Farklı formatlardaki dosyaları yükler ve DataFrame'e dönüştürür."""
     try:
-        if uploaded_file.name.endswith('.csv'):
-            df = pd.read_csv(uploaded_file)
-        elif uploaded_file.name.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(uploaded_file)
-        elif uploaded_file.name.endswith('.json'):
-            df = pd.read_json(uploaded_file)
-        else:
+        df = _read_uploaded_file(uploaded_file.name, uploaded_file.size, uploaded_file.getvalue())
+        if df is None:
             st.error("Desteklenmeyen dosya formatı!")
             return None
             
@@ -87,156 +213,114 @@ def load_data(uploaded_file: Any) -> Optional[pd.DataFrame]:
         st.error(f"Dosya yükleme hatası: {str(e)}")
         return None
 
+# RFM segment adları (_rfm_scores segment kodlarının sırasıyla)
+SEGMENT_NAMES = np.array(['VIP Müşteriler', 'Sadık Müşteriler', 'Potansiyel Müşteriler', 'Risk Altındaki Müşteriler'])
+
+# Olası 125 RFM skoru ("111" ... "555"); kod = (R-1)*25 + (F-1)*5 + (M-1)
+RFM_SCORE_LABELS = [f"{r}{f}{m}" for r in range(1, 6) for f in range(1, 6) for m in range(1, 6)]
+
+# Frequency için sabit eşikler (sağdan kapalı)
+FREQUENCY_EDGES = np.array([1, 2, 3, 5], dtype=np.float64)
+
+def _rfm_scores(recency: np.ndarray, frequency: np.ndarray, monetary: np.ndarray,
+                recency_edges: np.ndarray, monetary_edges: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """R, F, M skorlarını ve segment kodunu vektörel hesaplar (sınırlar sağdan kapalı)."""
+    # searchsorted(side='left') değerden küçük sınır sayısını verir: x <= sınır[k] ise dilim k
+    r_scores = (5 - np.searchsorted(recency_edges, recency, side='left')).astype(np.int8)
+    f_scores = (np.searchsorted(FREQUENCY_EDGES, frequency, side='left') + 1).astype(np.int8)
+    m_scores = (np.searchsorted(monetary_edges, monetary, side='left') + 1).astype(np.int8)
+    
+    # Segment: üç skorun en küçüğü belirleyicidir (>=4 -> 0, 3 -> 1, 2 -> 2, 1 -> 3)
+    lowest = np.minimum(np.minimum(r_scores, f_scores), np.minimum(m_scores, 4))
+    segment_ids = (4 - lowest).astype(np.int8)
+    
+    return r_scores, f_scores, m_scores, segment_ids
+
+@st.cache_data(show_spinner=False, max_entries=ANALYSIS_CACHE_MAX_ENTRIES, hash_funcs=_DF_HASH_FUNCS)
 def calculate_rfm(df: pd.DataFrame) -> pd.DataFrame:
     """RFM analizi yapar ve müşteri segmentasyonu oluşturur."""
     # Son işlem tarihini bul
     max_date = df['tarih'].max()
     
-    # Sipariş ID kontrolü - eğer yoksa tarih sütunuyla sipariş sayısı hesaplayalım
-    if 'siparis_id' not in df.columns:
-        # Gruplandırarak bir proxy sipariş ID oluşturalım
-        df['siparis_id_proxy'] = df.groupby(['musteri_id', df['tarih'].dt.date]).ngroup()
-        frequency_col = 'siparis_id_proxy'
-    else:
-        frequency_col = 'siparis_id'
-    
-    # RFM metriklerini hesapla
-    rfm = df.groupby('musteri_id').agg({
-        'tarih': lambda x: (max_date - x.max()).days,  # Recency
-        frequency_col: 'count',  # Frequency
-        'satis_tutari': 'sum'  # Monetary
-    }).rename(columns={
-        'tarih': 'recency',
-        frequency_col: 'frequency',
-        'satis_tutari': 'monetary'
-    })
+    # RFM metriklerini tek groupby'da hesapla
+    # Frequency: siparis_id varsa dolu kayıtlar, yoksa müşterinin her satırı bir sipariş sayılır
+    frequency_agg = ('siparis_id', 'count') if 'siparis_id' in df.columns else ('tarih', 'size')
+    rfm = df.groupby('musteri_id', sort=False, observed=True).agg(
+        last_tarih=('tarih', 'max'),
+        frequency=frequency_agg,
+        monetary=('satis_tutari', 'sum')
+    )
+    
+    # Recency: son işlemden bu yana geçen gün
+    last_purchase = rfm.pop('last_tarih')
+    rfm.insert(0, 'recency', (max_date - last_purchase).dt.days)
+    
+    # Kimliği dolu müşteri yoksa yüzdelik sınırlar hesaplanamaz; boş tablo aynı sütunlarla döner
+    if rfm.empty:
+        return rfm.reindex(columns=[*rfm.columns, 'R', 'F', 'M', 'RFM_Score', 'Segment'])
     
     # RFM skorlarını hesapla (1-5 arası)
     
-    # Recency için qcut kullan (küçük değerler daha iyi)
-    r_labels = range(5, 0, -1)
-    # Eğer 5'ten az farklı değer varsa, duplicates='drop' soruna neden olabilir
-    if len(rfm['recency'].unique()) < 5:
-        # Basit bir manual dönüşüm yapalım
-        rfm['R'] = pd.cut(rfm['recency'], 
-                        bins=[0, rfm['recency'].quantile(0.2), rfm['recency'].quantile(0.4), 
-                              rfm['recency'].quantile(0.6), rfm['recency'].quantile(0.8), float('inf')], 
-                        labels=[5, 4, 3, 2, 1], 
-                        include_lowest=True)
-    else:
-        # Yeterli veri varsa qcut kullanalım
-        try:
-            r_quartiles = pd.qcut(rfm['recency'], q=5, labels=r_labels, duplicates='drop')
-            rfm['R'] = r_quartiles
-        except ValueError:
-            # Yine de hata alırsak manual dönüşüm yapalım
-            rfm['R'] = pd.cut(rfm['recency'],
-                            bins=[0, rfm['recency'].quantile(0.2), rfm['recency'].quantile(0.4),
-                                rfm['recency'].quantile(0.6), rfm['recency'].quantile(0.8), float('inf')],
-                            labels=[5, 4, 3, 2, 1],
-                            include_lowest=True)
-    
-    # Frequency için manuel skorlama
-    def score_frequency(x):
-        if x <= 1:
-            return 1
-        elif x <= 2:
-            return 2
-        elif x <= 3:
-            return 3
-        elif x <= 5:
-            return 4
-        else:
-            return 5
-    
-    # Monetary için manuel skorlama
-    def score_monetary(x, percentiles):
-        if x <= percentiles[0]:
-            return 1
-        elif x <= percentiles[1]:
-            return 2
-        elif x <= percentiles[2]:
-            return 3
-        elif x <= percentiles[3]:
-            return 4
-        else:
-            return 5
+    # Recency için yüzdelik sınırlar tek seferde (küçük değerler daha iyi)
+    # Tüm işlemlerinin tarihi okunamayan (NaT) müşterilerde recency NaN'dir; sınırlar geçerli değerlerden alınır
+    recency = rfm['recency'].to_numpy(dtype=np.float64)
+    missing_recency = np.isnan(recency)
+    valid_count = len(recency) - int(missing_recency.sum())
+    recency_edges = np.nanquantile(recency, [0.2, 0.4, 0.6, 0.8]) if valid_count else np.zeros(4)
+    if valid_count and len(np.unique(recency_edges)) < len(recency_edges):
+        # Tekrarlanan sınırlar varsa sıralamaya göre eşit dilimlere böl
+        ranks = rfm['recency'].rank(method='first').to_numpy()
+        recency = (ranks - 1) * 5 // valid_count
+        recency_edges = np.arange(4, dtype=np.float64)
     
     # Monetary için yüzdelik dilimler
     monetary_percentiles = np.percentile(rfm['monetary'], [20, 40, 60, 80])
     
-    # Skorları hesapla
-    rfm['F'] = rfm['frequency'].apply(score_frequency)
-    rfm['M'] = rfm['monetary'].apply(lambda x: score_monetary(x, monetary_percentiles))
+    # Skorlar ve segmentler tek geçişte
+    r_scores, f_scores, m_scores, segment_ids = _rfm_scores(
+        recency,
+        rfm['frequency'].to_numpy(dtype=np.float64),
+        rfm['monetary'].to_numpy(dtype=np.float64),
+        recency_edges,
+        monetary_percentiles
+    )
+    # Recency'si bilinmeyen müşteri en düşük R skorunu alır
+    r_scores[missing_recency] = 1
+    rfm['R'] = r_scores
+    rfm['F'] = f_scores
+    rfm['M'] = m_scores
     
     # RFM skorunu hesapla
-    rfm['RFM_Score'] = rfm['R'].astype(str) + rfm['F'].astype(str) + rfm['M'].astype(str)
+    score_codes = (r_scores.astype(np.int16) - 1) * 25 + (f_scores - 1) * 5 + (m_scores - 1)
+    rfm['RFM_Score'] = pd.Categorical.from_codes(score_codes, categories=RFM_SCORE_LABELS)
     
     # Müşteri segmentlerini belirle
-    def segment_customers(row: pd.Series) -> str:
-        if row['R'] >= 4 and row['F'] >= 4 and row['M'] >= 4:
-            return 'VIP Müşteriler'
-        elif row['R'] >= 3 and row['F'] >= 3 and row['M'] >= 3:
-            return 'Sadık Müşteriler'
-        elif row['R'] >= 2 and row['F'] >= 2 and row['M'] >= 2:
-            return 'Potansiyel Müşteriler'
-        else:
-            return 'Risk Altındaki Müşteriler'
-    
-    rfm['Segment'] = rfm.apply(segment_customers, axis=1)
+    rfm['Segment'] = np.take(SEGMENT_NAMES, segment_ids)
     
     return rfm
 
-def analyze_time_series(df: pd.DataFrame) -> Dict[str, Any]:
-    """Zaman serisi analizi yapar."""
-    # Günlük satışları hesapla
-    daily_sales = df.groupby('tarih')['satis_tutari'].sum().reset_index()
-    daily_sales.set_index('tarih', inplace=True)
-    
-    # Hareketli ortalamalar
-    daily_sales['MA7'] = daily_sales['satis_tutari'].rolling(window=7).mean()
-    daily_sales['MA30'] = daily_sales['satis_tutari'].rolling(window=30).mean()
-    
-    # Mevsimsellik analizi
-    try:
-        decomposition = seasonal_decompose(daily_sales['satis_tutari'], period=30)
-        seasonal = decomposition.seasonal
-        trend = decomposition.trend
-        residual = decomposition.resid
-    except:
-        seasonal = trend = residual = None
-    
-    # Büyüme oranları
-    daily_sales['growth_rate'] = daily_sales['satis_tutari'].pct_change() * 100
-    
-    return {
-        'daily_sales': daily_sales,
-        'seasonal': seasonal,
-        'trend': trend,
-        'residual': residual
-    }
-
 def create_sales_heatmap(df: pd.DataFrame) -> go.Figure:
     """Günlük satış yoğunluğu için ısı haritası oluşturur."""
-    # Günlük satışları hesapla
-    df['satis_gunu'] = df['tarih'].dt.date
-    df['satis_saati'] = df['tarih'].dt.hour
-    
-    daily_sales = df.groupby(['satis_gunu', 'satis_saati'])['satis_tutari'].sum().reset_index()
-    
-    # Pivot tablo oluştur
-    pivot_table = daily_sales.pivot_table(
-        values='satis_tutari',
-        index='satis_saati',
-        columns='satis_gunu',
-        aggfunc='sum'
-    )
+    # Gün ve saat kodlarını df'ye sütun eklemeden çıkar
+    hourly = df['tarih'].values.astype('datetime64[h]')
+    valid = ~np.isnat(hourly)
+    hourly = hourly[valid]
+    day_codes, days = pd.factorize(hourly.astype('datetime64[D]'), sort=True)
+    hour_codes, hours = pd.factorize(hourly.astype(np.int64) % 24, sort=True)
+    sales = np.nan_to_num(df['satis_tutari'].to_numpy(dtype=np.float64)[valid])
+    
+    # Saat x gün matrisi tek geçişte; satış olmayan hücreler boş kalır
+    cells = hour_codes * len(days) + day_codes
+    size = len(hours) * len(days)
+    z = np.bincount(cells, weights=sales, minlength=size).reshape(len(hours), len(days))
+    counts = np.bincount(cells, minlength=size).reshape(len(hours), len(days))
+    z[counts == 0] = np.nan
     
     # Isı haritası oluştur
     fig = go.Figure(data=go.Heatmap(
-        z=pivot_table.values,
-        x=pivot_table.columns,
-        y=pivot_table.index,
+        z=z,
+        x=days,
+        y=hours,
         colorscale='Viridis'
     ))
     
@@ -249,47 +333,90 @@ def create_sales_heatmap(df: pd.DataFrame) -> go.Figure:
     
     return fig
 
+@st.cache_data(show_spinner=False, max_entries=ANALYSIS_CACHE_MAX_ENTRIES, hash_funcs=_DF_HASH_FUNCS)
 def analyze_categories(df: pd.DataFrame) -> Optional[Dict[str, Any]]:
     """Kategori bazlı analiz yapar."""
     if 'kategori' not in df.columns:
         return None
     
     # Kategori bazlı metrikler
-    category_metrics = df.groupby('kategori').agg({
+    category_metrics = _sort_by_label(df.groupby('kategori', sort=False, observed=True).agg({
         'satis_tutari': ['sum', 'mean', 'count'],
         'miktar': 'sum'
-    }).round(2)
+    }).round(2), df['kategori'])
     
     category_metrics.columns = ['Toplam Satış', 'Ortalama Satış', 'Sipariş Sayısı', 'Toplam Miktar']
     
-    # Kategori büyüme oranları
-    category_growth = df.groupby(['kategori', pd.Grouper(key='tarih', freq='M')])['satis_tutari'].sum().reset_index()
-    category_growth['growth'] = category_growth.groupby('kategori')['satis_tutari'].pct_change() * 100
+    # Kategori büyüme oranları (aylık anahtar doğrudan datetime64[M] ile)
+    months = pd.Series(df['tarih'].values.astype('datetime64[M]'), index=df.index, name='tarih')
+    category_growth = df.groupby(['kategori', months], observed=True)['satis_tutari'].sum().sort_index().reset_index()
+    
+    # Ay etiketlerini pd.Grouper(freq='M') gibi ay sonuna taşı
+    month_start = category_growth['tarih'].values.astype('datetime64[M]')
+    category_growth['tarih'] = ((month_start + 1).astype('datetime64[D]') - 1).astype('datetime64[ns]')
+    
+    # Sıralı (kategori, ay) satırlarında önceki aya göre değişim; kategori sınırları NaN
+    values = category_growth['satis_tutari'].to_numpy(dtype=np.float64)
+    categories = category_growth['kategori'].to_numpy()
+    growth = np.full(len(values), np.nan)
+    if len(values) > 1:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth[1:] = (values[1:] / values[:-1] - 1) * 100
+        growth[1:][categories[1:] != categories[:-1]] = np.nan
+    category_growth['growth'] = growth
     
     return {
         'metrics': category_metrics,
         'growth': category_growth
     }
 
+def _series_key(*arrays: np.ndarray) -> str:
+    """Model önbelleği için dizilerin içeriğinden kısa bir anahtar üretir."""
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+@st.cache_resource(show_spinner=False, max_entries=MODEL_CACHE_MAX_ENTRIES)
+def _fit_prophet(series_key: str, _daily_sales: pd.DataFrame, daily_seasonality: bool = True) -> Prophet:
+    """Prophet modelini eğitir; aynı seri için eğitilmiş model yeniden kullanılır."""
+    model = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=daily_seasonality)
+    model.fit(_daily_sales)
+    return model
+
+@st.cache_resource(show_spinner=False, max_entries=MODEL_CACHE_MAX_ENTRIES)
+def _fit_arima(series_key: str, _y: pd.Series) -> Any:
+    """auto_arima ile ARIMA modelini eğitir; aynı seri için model yeniden kullanılır."""
+    return pm.auto_arima(_y,
+                         seasonal=True,
+                         m=7,
+                         suppress_warnings=True)
+
+# Modeller ayrıca önbellekte; burada tahmin adımı da (Prophet predict) veri ve ufuk başına saklanır
+@st.cache_data(show_spinner=False, max_entries=MODEL_CACHE_MAX_ENTRIES, hash_funcs=_DF_HASH_FUNCS)
 def forecast_sales(df: pd.DataFrame, forecast_days: int = 30) -> Dict[str, Any]:
     """Satış tahmini yapar."""
     # Günlük satışları hesapla
     daily_sales = df.groupby('tarih')['satis_tutari'].sum().reset_index()
     daily_sales.columns = ['ds', 'y']
+    y_values = daily_sales['y'].to_numpy()
     
-    # Prophet modeli
-    model = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=True)
-    model.fit(daily_sales)
-    
-    # Gelecek tarihleri oluştur
-    future_dates = model.make_future_dataframe(periods=forecast_days)
-    forecast = model.predict(future_dates)
-    
-    # ARIMA modeli
-    arima_model = pm.auto_arima(daily_sales['y'],
-                               seasonal=True,
-                               m=7,
-                               suppress_warnings=True)
+    # ARIMA arka plan iş parçacığında eğitilir; Prophet'in Stan optimizasyonu ayrı süreçte
+    # çalıştığından bu sırada GIL serbesttir ve iki model birlikte ilerler
+    script_ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(max_workers=1, initializer=add_script_run_ctx, initargs=(None, script_ctx)) as executor:
+        arima_future = executor.submit(_fit_arima, _series_key(y_values), daily_sales['y'])
+        
+        # Prophet modeli (günlük mevsimsellik yalnızca gün içi veri varsa açılır)
+        has_intraday = daily_sales['ds'].dt.hour.nunique() > 1
+        model = _fit_prophet(_series_key(daily_sales['ds'].to_numpy(), y_values), daily_sales, has_intraday)
+        
+        # Gelecek tarihleri oluştur
+        future_dates = model.make_future_dataframe(periods=forecast_days)
+        forecast = model.predict(future_dates)
+        
+        # ARIMA modeli
+        arima_model = arima_future.result()
     
     arima_forecast = arima_model.predict(n_periods=forecast_days)
     
@@ -299,39 +426,35 @@ def forecast_sales(df: pd.DataFrame, forecast_days: int = 30) -> Dict[str, Any]:
         'last_date': daily_sales['ds'].max()
     }
 
+@st.cache_data(show_spinner=False, max_entries=ANALYSIS_CACHE_MAX_ENTRIES, hash_funcs=_DF_HASH_FUNCS)
 def optimize_stock(df: pd.DataFrame) -> pd.DataFrame:
     """Stok optimizasyonu önerileri oluşturur."""
     # Ürün bazlı analiz
-    product_analysis = df.groupby('urun_adi').agg({
+    product_analysis = _sort_by_label(df.groupby('urun_adi', sort=False, observed=True).agg({
         'miktar': ['sum', 'mean', 'std'],
         'tarih': 'count'
-    }).round(2)
+    }).round(2), df['urun_adi'])
     
     product_analysis.columns = ['Toplam Satış', 'Ortalama Satış', 'Satış Std', 'Sipariş Sayısı']
     
-    # Güvenlik stoku hesaplama (basit yöntem)
-    product_analysis['Güvenlik Stoku'] = (product_analysis['Ortalama Satış'] * 1.5).round()
-    
-    # Yeniden sipariş noktası
-    product_analysis['Yeniden Sipariş Noktası'] = (product_analysis['Ortalama Satış'] * 2).round()
+    # Güvenlik stoku ve yeniden sipariş noktası (basit yöntem)
+    ortalama_satis = product_analysis['Ortalama Satış'].to_numpy()
+    product_analysis['Güvenlik Stoku'] = np.round(ortalama_satis * 1.5)
+    product_analysis['Yeniden Sipariş Noktası'] = np.round(ortalama_satis * 2)
     
     # Stok durumu önerisi
-    def stock_recommendation(row: pd.Series) -> str:
-        if row['Toplam Satış'] > row['Güvenlik Stoku'] * 2:
-            return 'Yüksek Stok'
-        elif row['Toplam Satış'] < row['Güvenlik Stoku']:
-            return 'Stok Yenileme Gerekli'
-        else:
-            return 'Normal Stok'
-    
-    product_analysis['Stok Durumu'] = product_analysis.apply(stock_recommendation, axis=1)
+    toplam_satis = product_analysis['Toplam Satış'].to_numpy()
+    guvenlik_stoku = product_analysis['Güvenlik Stoku'].to_numpy()
+    product_analysis['Stok Durumu'] = np.select(
+        [toplam_satis > guvenlik_stoku * 2, toplam_satis < guvenlik_stoku],
+        ['Yüksek Stok', 'Stok Yenileme Gerekli'],
+        default='Normal Stok'
+    )
     
     return product_analysis
 
-def generate_report(df: pd.DataFrame, forecast_results: Dict[str, Any], stock_analysis: pd.DataFrame) -> str:
-    """Kapsamlı interaktif rapor oluşturur."""
-    # Gelişmiş rapor şablonu
-    template = """
+# Rapor şablonu kaynağı
+REPORT_TEMPLATE_SRC = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -917,10 +1040,8 @@ def generate_report(df: pd.DataFrame, forecast_results: Dict[str, Any], stock_an
                     <div class="recommendation">
                         <strong>{{ segment }}:</strong>
                         <ul>
-                            {% for item in strategy.split('\n') %}
-                            {% if item.strip() %}
-                            <li>{{ item.strip().replace('-', '', 1) }}</li>
-                            {% endif %}
+                            {% for item in strategy %}
+                            <li>{{ item }}</li>
                             {% endfor %}
                         </ul>
                     </div>
@@ -943,58 +1064,107 @@ def generate_report(df: pd.DataFrame, forecast_results: Dict[str, Any], stock_an
     </body>
     </html>
     """
+
+# Rapor tablolarındaki ondalık sütunların biçimleri (pandas yalnızca float sütunlara uygular)
+REPORT_FLOAT_FORMAT = '{:,.2f}'.format
+REPORT_PERCENT_FORMAT = '{:+.2f}%'.format
+
+# to_html'in kaçırdığı karakterler
+_HTML_ESCAPES = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+
+def _simple_table_html(columns: List[str], rows: List[Tuple[Any, ...]]) -> str:
+    """Birkaç satırlık özet tabloyu DataFrame kurmadan to_html(index=False) ile aynı biçimde üretir."""
+    header = ''.join(f"      <th>{str(column).translate(_HTML_ESCAPES)}</th>\n" for column in columns)
+    body = ''.join(
+        "    <tr>\n" + ''.join(f"      <td>{str(value).translate(_HTML_ESCAPES)}</td>\n" for value in row) + "    </tr>\n"
+        for row in rows
+    )
+    return (
+        '<table border="1" class="dataframe table table-striped">\n'
+        '  <thead>\n'
+        '    <tr style="text-align: right;">\n'
+        f'{header}'
+        '    </tr>\n'
+        '  </thead>\n'
+        '  <tbody>\n'
+        f'{body}'
+        '  </tbody>\n'
+        '</table>'
+    )
+
+@st.cache_resource(show_spinner=False)
+def _compile_template(source: str) -> Template:
+    """Jinja şablonunu derler; Streamlit yeniden çalıştırmalarında derlenmiş şablon paylaşılır."""
+    return Template(source)
+
+@st.cache_data(show_spinner=False, max_entries=ANALYSIS_CACHE_MAX_ENTRIES, hash_funcs=_DF_HASH_FUNCS)
+def generate_report(df: pd.DataFrame, forecast_results: Dict[str, Any], stock_analysis: pd.DataFrame,
+                    report_date: pd.Timestamp) -> str:
+    """Kapsamlı interaktif rapor oluşturur."""
+    # Metin gruplama anahtarlarını kategoriye çevir (load_data'dan gelen veri zaten dönüştürülmüştür)
+    object_keys = {column: 'category' for column in CATEGORY_COLUMNS
+                   if column in df.columns and df[column].dtype == object}
+    if object_keys:
+        df = df.astype(object_keys)
     
     # Ek analiz verileri
-    current_date = pd.Timestamp.now().strftime("%d.%m.%Y")
+    # Rapor tarihi dışarıdan verilir; önbellekten dönen rapor ilk oluşturulduğu günle damgalanmaz
+    current_date = report_date.strftime("%d.%m.%Y")
     date_range = f"{df['tarih'].min().strftime('%d.%m.%Y')} - {df['tarih'].max().strftime('%d.%m.%Y')}"
     unique_products_count = df['urun_adi'].nunique()
     total_records = len(df)
     
     # Veri kalitesi kontrolü
-    missing_data = df.isnull().sum().sum()
-    data_quality_score = 100 - (missing_data / (df.size) * 100)
+    missing_mask = df.isna().to_numpy()
+    missing_data = missing_mask.sum()
+    data_quality_score = 100 - (missing_data / missing_mask.size * 100)
     data_quality = f"%{data_quality_score:.1f} (Eksik Veri: {missing_data})"
     
-    # Özet istatistikler
-    summary_stats_df = pd.DataFrame({
-        'Metrik': ['Toplam Satış', 'Ortalama Satış', 'Minimum Satış', 'Maksimum Satış', 'Standart Sapma', 'Ürün Çeşidi', 'Tarih Aralığı'],
-        'Değer': [
-            f"₺{df['satis_tutari'].sum():,.2f}",
-            f"₺{df['satis_tutari'].mean():,.2f}",
-            f"₺{df['satis_tutari'].min():,.2f}",
-            f"₺{df['satis_tutari'].max():,.2f}",
-            f"₺{df['satis_tutari'].std():,.2f}",
-            unique_products_count,
-            date_range
-        ]
-    })
+    # Özet istatistikler (satış tutarı istatistikleri bir kez hesaplanır)
+    sales_stats = df['satis_tutari'].agg(['sum', 'mean', 'min', 'max', 'std'])
+    summary_stats_html = _simple_table_html(['Metrik', 'Değer'], [
+        ('Toplam Satış', f"₺{sales_stats['sum']:,.2f}"),
+        ('Ortalama Satış', f"₺{sales_stats['mean']:,.2f}"),
+        ('Minimum Satış', f"₺{sales_stats['min']:,.2f}"),
+        ('Maksimum Satış', f"₺{sales_stats['max']:,.2f}"),
+        ('Standart Sapma', f"₺{sales_stats['std']:,.2f}"),
+        ('Ürün Çeşidi', unique_products_count),
+        ('Tarih Aralığı', date_range)
+    ])
     
     # Stok durumu analizi
+    stock_status_counts = stock_analysis['Stok Durumu'].value_counts()
+    low_stock_count = int(stock_status_counts.get('Stok Yenileme Gerekli', 0))
+    normal_stock_count = int(stock_status_counts.get('Normal Stok', 0))
+    high_stock_count = int(stock_status_counts.get('Yüksek Stok', 0))
     low_stock_items = stock_analysis[stock_analysis['Stok Durumu'] == 'Stok Yenileme Gerekli']
-    low_stock_count = len(low_stock_items)
-    normal_stock_count = len(stock_analysis[stock_analysis['Stok Durumu'] == 'Normal Stok'])
-    high_stock_count = len(stock_analysis[stock_analysis['Stok Durumu'] == 'Yüksek Stok'])
     
     # Acil sipariş ürünleri
-    try:
-        urgent_stock_products_df = low_stock_items.sort_values('Toplam Satış', ascending=False).head(10)
+    if low_stock_items.empty:
+        urgent_stock_products_html = "<p>Acil sipariş edilmesi gereken ürün bulunamadı.</p>"
+    else:
+        urgent_stock_products_df = low_stock_items.nlargest(10, 'Toplam Satış')
         urgent_stock_products_html = urgent_stock_products_df.to_html(
             classes='table table-striped',
-            float_format=lambda x: '{:,.2f}'.format(x) if isinstance(x, float) else x
+            float_format=REPORT_FLOAT_FORMAT
         )
-    except:
-        urgent_stock_products_html = "<p>Acil sipariş edilmesi gereken ürün bulunamadı.</p>"
     
     # Günlük ve haftalık satış analizleri
-    try:
-        daily_sales = df.groupby(df['tarih'].dt.date)['satis_tutari'].sum()
+    daily_sales = df.groupby(df['tarih'].dt.normalize())['satis_tutari'].sum()
+    if daily_sales.empty:
+        daily_avg_sales = 0
+        weekly_max_sales = 0
+        best_sales_day = "Veri yok"
+        best_sales_hour = "Veri yok"
+    else:
         daily_avg_sales = daily_sales.mean()
-        weekly_max_sales = df.groupby(df['tarih'].dt.isocalendar().week)['satis_tutari'].sum().max()
+        # Haftalık toplamlar günlük toplamlardan (Pazartesi-Pazar takvim haftaları)
+        weekly_max_sales = daily_sales.resample('W').sum().max()
         
         # En iyi satış günü ve saati
         best_day_idx = daily_sales.idxmax()
-        best_day_name = pd.Timestamp(best_day_idx).strftime('%A')
-        best_day_formatted = pd.Timestamp(best_day_idx).strftime('%d.%m.%Y')
+        best_day_name = best_day_idx.strftime('%A')
+        best_day_formatted = best_day_idx.strftime('%d.%m.%Y')
         best_sales_day = f"{best_day_name}, {best_day_formatted}"
         
         # En iyi satış saati
@@ -1002,11 +1172,6 @@ def generate_report(df: pd.DataFrame, forecast_results: Dict[str, Any], stock_an
             df['satis_saati'] = df['tarih'].dt.hour
             
         best_sales_hour = f"{df.groupby('satis_saati')['satis_tutari'].sum().idxmax()}:00"
-    except:
-        daily_avg_sales = 0
-        weekly_max_sales = 0
-        best_sales_day = "Veri yok"
-        best_sales_hour = "Veri yok"
     
     # En çok satan ürünler
     top_products_data = None
@@ -1014,22 +1179,21 @@ def generate_report(df: pd.DataFrame, forecast_results: Dict[str, Any], stock_an
     top_product_sales = 0
     
     try:
-        # En çok satan 10 ürün
-        top_products = df.groupby('urun_adi')['miktar'].sum().sort_values(ascending=False).head(10)
-        top_product_name = top_products.index[0]
-        top_product_sales = top_products.iloc[0]
-        
-        # Tablo için dataframe oluştur
-        top_products_df = df.groupby('urun_adi').agg({
+        # Ürün bazlı toplamlar tek groupby ile
+        top_products_df = df.groupby('urun_adi', observed=True).agg({
             'miktar': 'sum',
             'satis_tutari': ['sum', 'mean']
         }).round(2)
         
         top_products_df.columns = ['Toplam Satış Miktarı', 'Toplam Satış Tutarı', 'Ortalama Satış Tutarı']
-        top_products_df = top_products_df.sort_values('Toplam Satış Miktarı', ascending=False).head(10)
+        
+        # En çok satan 10 ürün (tam sıralama yerine kısmi seçim)
+        top_products_df = top_products_df.nlargest(10, 'Toplam Satış Miktarı')
+        top_product_name = top_products_df.index[0]
+        top_product_sales = top_products_df['Toplam Satış Miktarı'].iloc[0]
         
         # En yüksek cirolu ürünler
-        top_revenue_df = top_products_df.sort_values('Toplam Satış Tutarı', ascending=False).head(10)
+        top_revenue_df = top_products_df.nlargest(10, 'Toplam Satış Tutarı')
         
         # Düşük performanslı ürünler (belirli bir eşiğin altında satış yapan ürünler)
         sales_threshold = top_products_df['Toplam Satış Miktarı'].median() * 0.3
@@ -1038,19 +1202,21 @@ def generate_report(df: pd.DataFrame, forecast_results: Dict[str, Any], stock_an
         # HTML tabloları oluştur
         top_products_data = top_products_df.to_html(
             classes='table table-striped',
-            float_format=lambda x: '{:,.2f}'.format(x) if isinstance(x, float) else x
+            float_format=REPORT_FLOAT_FORMAT
         )
         
         top_revenue_products = top_revenue_df.to_html(
             classes='table table-striped',
-            float_format=lambda x: '{:,.2f}'.format(x) if isinstance(x, float) else x
+            float_format=REPORT_FLOAT_FORMAT
         )
         
         low_performing_products = low_performing_df.to_html(
             classes='table table-striped',
-            float_format=lambda x: '{:,.2f}'.format(x) if isinstance(x, float) else x
+            float_format=REPORT_FLOAT_FORMAT
         ) if not low_performing_df.empty else "<p>Düşük performanslı ürün tespit edilmedi.</p>"
-    except:
+    except (IndexError, TypeError, ValueError):
+        # Boş veri (index[0]) veya sayısal olmayan miktar/tutar sütunları
+        logger.warning("Rapor ürün analizi atlandı", exc_info=True)
         top_products_data = "<p>Ürün analizi yapılırken bir hata oluştu.</p>"
         top_revenue_products = "<p>Ciro analizi yapılırken bir hata oluştu.</p>"
         low_performing_products = "<p>Performans analizi yapılırken bir hata oluştu.</p>"
@@ -1059,7 +1225,7 @@ def generate_report(df: pd.DataFrame, forecast_results: Dict[str, Any], stock_an
     category_performance = ""
     if 'kategori' in df.columns:
         try:
-            category_df = df.groupby('kategori').agg({
+            category_df = df.groupby('kategori', observed=True).agg({
                 'satis_tutari': ['sum', 'mean', 'count'],
                 'miktar': 'sum'
             }).round(2)
@@ -1067,9 +1233,11 @@ def generate_report(df: pd.DataFrame, forecast_results: Dict[str, Any], stock_an
             category_df.columns = ['Toplam Satış', 'Ortalama Satış', 'Sipariş Sayısı', 'Toplam Miktar']
             category_performance = category_df.sort_values('Toplam Satış', ascending=False).to_html(
                 classes='table table-striped',
-                float_format=lambda x: '{:,.2f}'.format(x) if isinstance(x, float) else x
+                float_format=REPORT_FLOAT_FORMAT
             )
-        except:
+        except (TypeError, ValueError):
+            # Sayısal olmayan tutar/miktar sütunları
+            logger.warning("Rapor kategori analizi atlandı", exc_info=True)
             category_performance = "<p>Kategori analizi yapılırken bir hata oluştu.</p>"
     else:
         category_performance = "<p>Kategori verisi bulunamadı.</p>"
@@ -1084,7 +1252,7 @@ def generate_report(df: pd.DataFrame, forecast_results: Dict[str, Any], stock_an
     new_customer_rate = 0
     customer_count = 0
     
-    if 'musteri_id' in df.columns:
+    if 'musteri_id' in df.columns and df['musteri_id'].notna().any():
         try:
             # Toplam müşteri sayısı
             customer_count = df['musteri_id'].nunique()
@@ -1105,37 +1273,44 @@ def generate_report(df: pd.DataFrame, forecast_results: Dict[str, Any], stock_an
             
             segment_metrics = segment_metrics.round(2)
             
-            # VIP müşteri istatistikleri
-            vip_customers = rfm_data[rfm_data['Segment'] == 'VIP Müşteriler']
+            # VIP müşteri istatistikleri (RFM özetleri tek agg çağrısında)
+            rfm_summary = rfm_data.agg({'monetary': ['sum', 'mean'], 'frequency': 'mean'})
+            monetary_values = rfm_data['monetary'].to_numpy()
+            vip_mask = rfm_data['Segment'].to_numpy() == 'VIP Müşteriler'
             total_customers = len(rfm_data)
-            total_sales = rfm_data['monetary'].sum()
+            total_sales = rfm_summary.at['sum', 'monetary']
             
-            vip_percentage = round((len(vip_customers) / total_customers) * 100, 1) if total_customers > 0 else 0
-            vip_sales_percentage = round((vip_customers['monetary'].sum() / total_sales) * 100, 1) if total_sales > 0 else 0
+            vip_percentage = round((vip_mask.sum() / total_customers) * 100, 1) if total_customers > 0 else 0
+            vip_sales_percentage = round((monetary_values[vip_mask].sum() / total_sales) * 100, 1) if total_sales > 0 else 0
             
             # En değerli müşteriler
             top_customers_df = rfm_data.sort_values('monetary', ascending=False).head(10)
             
             # Müşteri yaşam boyu değeri ve sipariş sıklığı
-            avg_customer_value = rfm_data['monetary'].mean()
-            avg_order_frequency = rfm_data['frequency'].mean()
+            avg_customer_value = rfm_summary.at['mean', 'monetary']
+            avg_order_frequency = rfm_summary.at['mean', 'frequency']
             
             # HTML tabloları oluştur
             segment_data = segment_metrics.to_html(
                 classes='table table-striped',
-                float_format=lambda x: '{:,.2f}'.format(x) if isinstance(x, float) else x
+                float_format=REPORT_FLOAT_FORMAT
             )
             
             top_customers = top_customers_df.to_html(
                 classes='table table-striped',
-                float_format=lambda x: '{:,.2f}'.format(x) if isinstance(x, float) else x
+                float_format=REPORT_FLOAT_FORMAT
             )
-        except Exception as e:
+        except (TypeError, ValueError) as e:
+            logger.warning("Rapor müşteri segmentasyonu atlandı", exc_info=True)
             segment_data = f"<p>Müşteri segmentasyonu yapılırken bir hata oluştu: {str(e)}</p>"
             top_customers = "<p>Müşteri analizi yapılırken bir hata oluştu.</p>"
             vip_percentage = 0
             vip_sales_percentage = 0
             
+    elif 'musteri_id' in df.columns:
+        # Müşteri kimlikleri tamamen boş: RFM tablosu boş olacağından bölüm atlanır
+        segment_data = "<p>Müşteri segmentasyonu için müşteri kimliği bulunan kayıt yok.</p>"
+        top_customers = "<p>Müşteri analizi için müşteri kimliği bulunan kayıt yok.</p>"
     else:
         segment_data = "<p>Müşteri analizi için 'musteri_id' sütunu gereklidir.</p>"
         top_customers = "<p>Müşteri analizi için 'musteri_id' sütunu gereklidir.</p>"
@@ -1160,79 +1335,62 @@ def generate_report(df: pd.DataFrame, forecast_results: Dict[str, Any], stock_an
     sales_trend_description = "Satış trendi analizi için yeterli veri bulunamadı."
     
     # Dönemsel tahminler
-    forecast_periods_html = "<p>Dönemsel tahmin analizi yapılırken bir hata oluştu.</p>"
     category_growth_forecast_html = "<p>Kategori büyüme tahmini yapılırken bir hata oluştu.</p>"
     
-    try:
-        # Son 30 günlük tahminleri al
-        forecast_daily = forecast_results['prophet_forecast'].tail(30)
-        
-        # Haftalık, aylık ve çeyreklik tahminler
-        weekly_forecast = forecast_daily.groupby(pd.Grouper(key='ds', freq='W'))['yhat'].sum().reset_index()
-        weekly_forecast.columns = ['Hafta', 'Tahmini Satış (TL)']
-        
-        monthly_forecast = forecast_daily.groupby(pd.Grouper(key='ds', freq='M'))['yhat'].sum().reset_index()
-        monthly_forecast.columns = ['Ay', 'Tahmini Satış (TL)']
-        
-        # Tahmin tabloları
-        forecast_periods_df = pd.DataFrame({
-            'Dönem': ['Haftalık (Sonraki 4 Hafta)', 'Yıllık (Sonraki Yıl)'],
-            'Tahmini Satış (TL)': [
-                f"₺{weekly_forecast['Tahmini Satış (TL)'].sum():,.2f}",
-                f"₺{monthly_forecast['Tahmini Satış (TL)'].sum() * 12:,.2f}"
-            ]
-        })
-        
-        forecast_periods_html = forecast_periods_df.to_html(
-            classes='table table-striped',
-            index=False
-        )
-        
-        # Kategori büyüme tahminleri
-        if 'kategori' in df.columns:
-            try:
-                # Son 3 aylık kategori bazlı büyüme oranlarını hesapla
-                df['ay'] = df['tarih'].dt.to_period('M')
-                last_3months = df.groupby(['kategori', 'ay'])['satis_tutari'].sum().unstack().fillna(0)
+    # Son 30 günlük tahminleri al
+    forecast_daily = forecast_results['prophet_forecast'].tail(30)
+    
+    # Haftalık ve aylık kovaların toplamı, 30 günün toplamına eşittir
+    forecast_total = forecast_daily['yhat'].sum()
+    
+    # Tahmin tabloları
+    forecast_periods_html = _simple_table_html(['Dönem', 'Tahmini Satış (TL)'], [
+        ('Haftalık (Sonraki 4 Hafta)', f"₺{forecast_total:,.2f}"),
+        ('Yıllık (Sonraki Yıl)', f"₺{forecast_total * 12:,.2f}")
+    ])
+    
+    # Kategori büyüme tahminleri
+    if 'kategori' in df.columns:
+        try:
+            # Son 3 aylık kategori bazlı büyüme oranlarını hesapla (ay anahtarı df'ye eklenmeden)
+            months = pd.Series(df['tarih'].values.astype('datetime64[M]'), index=df.index, name='ay')
+            last_3months = df.groupby(['kategori', months], observed=True)['satis_tutari'].sum().unstack(fill_value=0)
+            
+            if len(last_3months.columns) >= 2:
+                monthly_sales = last_3months.to_numpy()
+                growth_rates = (monthly_sales[:, -1] / monthly_sales[:, -2] - 1) * 100
                 
-                if len(last_3months.columns) >= 2:
-                    growth_rates = ((last_3months[last_3months.columns[-1]] / last_3months[last_3months.columns[-2]]) - 1) * 100
-                    
-                    category_growth_df = pd.DataFrame({
-                        'Kategori': growth_rates.index,
-                        'Son Ay Büyüme (%)': growth_rates.values,
-                        'Tahmini Sonraki Ay (%)': growth_rates.values * 0.8  # Basit bir tahmin
-                    }).sort_values('Tahmini Sonraki Ay (%)', ascending=False)
-                    
-                    category_growth_forecast_html = category_growth_df.to_html(
-                        classes='table table-striped',
-                        float_format=lambda x: '{:+.2f}%'.format(x) if isinstance(x, float) else x,
-                        index=False
-                    )
-            except:
-                category_growth_forecast_html = "<p>Kategori büyüme tahmini için yeterli veri bulunamadı.</p>"
-    except:
-        forecast_periods_html = "<p>Dönemsel tahmin analizi için yeterli veri bulunamadı.</p>"
+                category_growth_df = pd.DataFrame({
+                    'Kategori': last_3months.index,
+                    'Son Ay Büyüme (%)': growth_rates,
+                    'Tahmini Sonraki Ay (%)': growth_rates * 0.8  # Basit bir tahmin
+                }).sort_values('Tahmini Sonraki Ay (%)', ascending=False)
+                
+                category_growth_forecast_html = category_growth_df.to_html(
+                    classes='table table-striped',
+                    float_format=REPORT_PERCENT_FORMAT,
+                    index=False
+                )
+        except (TypeError, ValueError):
+            logger.warning("Rapor kategori büyüme tahmini atlandı", exc_info=True)
+            category_growth_forecast_html = "<p>Kategori büyüme tahmini için yeterli veri bulunamadı.</p>"
     
     # Son 30 günlük satış trendi
-    try:
-        df['tarih_gun'] = df['tarih'].dt.date
-        last_30days = df.groupby('tarih_gun')['satis_tutari'].sum().tail(30)
-        
-        if len(last_30days) > 15:
-            # Basit doğrusal regresyon ile trend analizi
-            x = np.arange(len(last_30days))
-            y = last_30days.values
-            slope, _, _, _, _ = stats.linregress(x, y)
-            
-            if slope > 0:
-                sales_trend_description = f"Son 30 günde satışlarda %{slope*100/y.mean():.1f} artış trendi görülmektedir. Bu artış devam ederse, gelecek ayda satışların daha da yükselmesi beklenebilir."
-            elif slope < 0:
-                sales_trend_description = f"Son 30 günde satışlarda %{-slope*100/y.mean():.1f} düşüş trendi görülmektedir. Satışları artırmak için pazarlama stratejileri gözden geçirilmelidir."
-            else:
-                sales_trend_description = "Son 30 günde satışlar stabil seyretmektedir. Büyüme için yeni stratejiler geliştirilebilir."
-    except:
-        pass
+    last_30days = daily_sales.tail(30)
+    
+    if len(last_30days) > 15:
+        # Basit doğrusal regresyon ile trend analizi (yalnızca eğim gerekli)
+        x = np.arange(len(last_30days), dtype=np.float64)
+        y = last_30days.values
+        x_centered = x - x.mean()
+        slope = np.dot(x_centered, y - y.mean()) / np.dot(x_centered, x_centered)
+        
+        if slope > 0:
+            sales_trend_description = f"Son 30 günde satışlarda %{slope*100/y.mean():.1f} artış trendi görülmektedir. Bu artış devam ederse, gelecek ayda satışların daha da yükselmesi beklenebilir."
+        elif slope < 0:
+            sales_trend_description = f"Son 30 günde satışlarda %{-slope*100/y.mean():.1f} düşüş trendi görülmektedir. Satışları artırmak için pazarlama stratejileri gözden geçirilmelidir."
+        else:
+            sales_trend_description = "Son 30 günde satışlar stabil seyretmektedir. Büyüme için yeni stratejiler geliştirilebilir."
     
     # Aksiyon önerileri
     sales_actions = [
@@ -1296,11 +1454,17 @@ def generate_report(df: pd.DataFrame, forecast_results: Dict[str, Any], stock_an
         """
     }
     
+    # Strateji metinlerini şablona hazır madde listelerine böl
+    segments_bullets = {
+        segment: [line.strip().replace('-', '', 1) for line in strategy.split('\n') if line.strip()]
+        for segment, strategy in segments_strategies.items()
+    }
+    
     # Şablonu doldur
-    html_content = Template(template).render(
+    html_content = _compile_template(REPORT_TEMPLATE_SRC).render(
         # Genel metrikler
-        total_sales=f"{df['satis_tutari'].sum():,.2f}",
-        avg_sales=f"{df['satis_tutari'].mean():,.2f}",
+        total_sales=f"{sales_stats['sum']:,.2f}",
+        avg_sales=f"{sales_stats['mean']:,.2f}",
         total_orders=f"{len(df):,}",
         unique_products=f"{unique_products_count:,}",
         period_description=date_range,
@@ -1308,7 +1472,7 @@ def generate_report(df: pd.DataFrame, forecast_results: Dict[str, Any], stock_an
         # Özet istatistikler
         total_records=f"{total_records:,}",
         data_quality=data_quality,
-        summary_stats=summary_stats_df.to_html(classes='table table-striped', index=False),
+        summary_stats=summary_stats_html,
         
         # Dönemsel analizler
         daily_avg_sales=f"{daily_avg_sales:,.2f}",
@@ -1368,7 +1532,7 @@ def generate_report(df: pd.DataFrame, forecast_results: Dict[str, Any], stock_an
         customer_strategy=customer_strategy,
         sales_actions=sales_actions,
         stock_actions=stock_actions,
-        segments_strategies=segments_strategies,
+        segments_strategies=segments_bullets,
         
         # Diğer
         generation_date=current_date
@@ -1376,6 +1540,23 @@ def generate_report(df: pd.DataFrame, forecast_results: Dict[str, Any], stock_an
     
     return html_content
 
+# Dönem adı -> verideki son tarihten (başlangıç, bitiş) aralığını üreten fonksiyon
+PERIOD_RANGES = {
+    'Bu Ay': lambda end: (end.replace(day=1), end),
+    'Bu Hafta': lambda end: (end - pd.Timedelta(days=end.weekday()), end),
+    'Bu Yıl': lambda end: (end.replace(month=1, day=1), end),
+    'Son 30 Gün': lambda end: (end - pd.Timedelta(days=30), end),
+    'Son 90 Gün': lambda end: (end - pd.Timedelta(days=90), end),
+    'Geçen Ay': lambda end: ((end.replace(day=1) - pd.Timedelta(days=1)).replace(day=1),
+                             end.replace(day=1) - pd.Timedelta(days=1)),
+    'Geçen Hafta': lambda end: (end - pd.Timedelta(days=end.weekday() + 7),
+                                end - pd.Timedelta(days=end.weekday() + 1)),
+    'Geçen Yıl': lambda end: (end.replace(year=end.year - 1, month=1, day=1),
+                              end.replace(year=end.year - 1, month=12, day=31)),
+    'Önceki 30 Gün': lambda end: (end - pd.Timedelta(days=60), end - pd.Timedelta(days=30)),
+    'Önceki 90 Gün': lambda end: (end - pd.Timedelta(days=180), end - pd.Timedelta(days=90)),
+}
+
 def comparative_analysis(df):
     st.header("🔄 Karşılaştırmalı Analiz")
     st.info("""
@@ -1398,38 +1579,10 @@ def comparative_analysis(df):
             key='compare_with'
         )
     
-    # Dönemleri hesapla
-    def get_date_range(period):
-        end_date = df['tarih'].max()
-        if period == 'Bu Ay':
-            start_date = end_date.replace(day=1)
-        elif period == 'Bu Hafta':
-            start_date = end_date - pd.Timedelta(days=end_date.weekday())
-        elif period == 'Bu Yıl':
-            start_date = end_date.replace(month=1, day=1)
-        elif period == 'Son 30 Gün':
-            start_date = end_date - pd.Timedelta(days=30)
-        elif period == 'Son 90 Gün':
-            start_date = end_date - pd.Timedelta(days=90)
-        elif period == 'Geçen Ay':
-            start_date = (end_date.replace(day=1) - pd.Timedelta(days=1)).replace(day=1)
-            end_date = end_date.replace(day=1) - pd.Timedelta(days=1)
-        elif period == 'Geçen Hafta':
-            start_date = end_date - pd.Timedelta(days=end_date.weekday() + 7)
-            end_date = end_date - pd.Timedelta(days=end_date.weekday() + 1)
-        elif period == 'Geçen Yıl':
-            start_date = end_date.replace(year=end_date.year-1, month=1, day=1)
-            end_date = end_date.replace(year=end_date.year-1, month=12, day=31)
-        elif period == 'Önceki 30 Gün':
-            start_date = end_date - pd.Timedelta(days=60)
-            end_date = end_date - pd.Timedelta(days=30)
-        elif period == 'Önceki 90 Gün':
-            start_date = end_date - pd.Timedelta(days=180)
-            end_date = end_date - pd.Timedelta(days=90)
-        return start_date, end_date
-    
-    current_start, current_end = get_date_range(current_period)
-    compare_start, compare_end = get_date_range(compare_with)
+    # Dönemleri hesapla (son tarih bir kez bulunur)
+    end_date = df['tarih'].max()
+    current_start, current_end = PERIOD_RANGES[current_period](end_date)
+    compare_start, compare_end = PERIOD_RANGES[compare_with](end_date)
     
     # Dönem verilerini filtrele
     current_data = df[(df['tarih'] >= current_start) & (df['tarih'] <= current_end)]
@@ -1443,13 +1596,21 @@ def comparative_analysis(df):
         'Ortalama Sepet': ('satis_tutari', 'mean')
     }
     
-    # Metrikleri hesapla ve göster
+    # Her sütun/işlem çifti bir kez hesaplanır (aynı ortalama iki metrikte kullanılıyor)
+    agg_spec = {}
+    for column, operation in metrics.values():
+        if operation not in agg_spec.setdefault(column, []):
+            agg_spec[column].append(operation)
+    current_stats = current_data.agg(agg_spec)
+    compare_stats = compare_data.agg(agg_spec)
+    
+    # Metrikleri göster
     st.subheader("Dönemsel Karşılaştırma Metrikleri")
     col1, col2, col3, col4 = st.columns(4)  # 4 sütun oluştur
     
     for i, (metric_name, (column, operation)) in enumerate(metrics.items()):
-        current_value = getattr(current_data[column], operation)()
-        compare_value = getattr(compare_data[column], operation)()
+        current_value = current_stats.at[operation, column]
+        compare_value = compare_stats.at[operation, column]
         change = ((current_value - compare_value) / compare_value * 100) if compare_value != 0 else 0
         
         with [col1, col2, col3, col4][i]:  # Her metrik için ayrı sütun
@@ -1466,25 +1627,28 @@ def comparative_analysis(df):
     daily_current = current_data.groupby('tarih')['satis_tutari'].sum()
     daily_compare = compare_data.groupby('tarih')['satis_tutari'].sum()
     
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=daily_current.index, 
-        y=daily_current.values,
-        name=current_period, 
-        line=dict(color='blue')
-    ))
-    fig.add_trace(go.Scatter(
-        x=daily_compare.index, 
-        y=daily_compare.values,
-        name=compare_with, 
-        line=dict(color='gray', dash='dash')
-    ))
-    
-    fig.update_layout(
-        title='Günlük Satış Karşılaştırması',
-        xaxis_title='Tarih',
-        yaxis_title='Satış Tutarı (₺)',
-        height=400
+    # İzler ve düzen tek seferde verilir; add_trace/update_layout ile figür tekrar tekrar doğrulanmaz
+    fig = go.Figure(
+        data=[
+            go.Scatter(
+                x=daily_current.index.to_numpy(),
+                y=daily_current.to_numpy(),
+                name=current_period,
+                line=dict(color='blue')
+            ),
+            go.Scatter(
+                x=daily_compare.index.to_numpy(),
+                y=daily_compare.to_numpy(),
+                name=compare_with,
+                line=dict(color='gray', dash='dash')
+            )
+        ],
+        layout=dict(
+            title='Günlük Satış Karşılaştırması',
+            xaxis_title='Tarih',
+            yaxis_title='Satış Tutarı (₺)',
+            height=400
+        )
     )
     st.plotly_chart(fig, use_container_width=True)
     
@@ -1492,8 +1656,8 @@ def comparative_analysis(df):
     if 'kategori' in df.columns:
         st.subheader("Kategori Bazlı Karşılaştırma")
         
-        category_current = current_data.groupby('kategori')['satis_tutari'].sum()
-        category_compare = compare_data.groupby('kategori')['satis_tutari'].sum()
+        category_current = current_data.groupby('kategori', observed=True)['satis_tutari'].sum()
+        category_compare = compare_data.groupby('kategori', observed=True)['satis_tutari'].sum()
         
         # Kategori büyüme oranları
         category_growth = pd.DataFrame({
@@ -1505,26 +1669,29 @@ def comparative_analysis(df):
                                           category_growth['Önceki Dönem'] * 100).fillna(0)
         
         # Kategori karşılaştırma grafiği
-        fig = go.Figure()
-        fig.add_trace(go.Bar(
-            x=category_growth.index,
-            y=category_growth['Mevcut Dönem'],
-            name=current_period,
-            marker_color='blue'
-        ))
-        fig.add_trace(go.Bar(
-            x=category_growth.index,
-            y=category_growth['Önceki Dönem'],
-            name=compare_with,
-            marker_color='gray'
-        ))
-        
-        fig.update_layout(
-            title='Kategori Bazlı Satış Karşılaştırması',
-            xaxis_title='Kategori',
-            yaxis_title='Satış Tutarı (₺)',
-            barmode='group',
-            height=400
+        kategoriler = category_growth.index.to_numpy()
+        fig = go.Figure(
+            data=[
+                go.Bar(
+                    x=kategoriler,
+                    y=category_growth['Mevcut Dönem'].to_numpy(),
+                    name=current_period,
+                    marker_color='blue'
+                ),
+                go.Bar(
+                    x=kategoriler,
+                    y=category_growth['Önceki Dönem'].to_numpy(),
+                    name=compare_with,
+                    marker_color='gray'
+                )
+            ],
+            layout=dict(
+                title='Kategori Bazlı Satış Karşılaştırması',
+                xaxis_title='Kategori',
+                yaxis_title='Satış Tutarı (₺)',
+                barmode='group',
+                height=400
+            )
         )
         st.plotly_chart(fig, use_container_width=True)
         
@@ -1539,6 +1706,23 @@ def comparative_analysis(df):
             })
         )
 
+@st.cache_data(show_spinner=False, max_entries=ANALYSIS_CACHE_MAX_ENTRIES, hash_funcs=_DF_HASH_FUNCS)
+def _product_aggregates(df: pd.DataFrame) -> Tuple[pd.Series, pd.DataFrame]:
+    """En çok satan ürünleri ve ürün detay tablosunu hesaplar."""
+    # Tek gruplama; en çok satanlar aynı tablonun miktar sütunundan alınır
+    product_details = df.groupby('urun_adi', observed=True, sort=False).agg(
+        **{
+            'Toplam Satış Miktarı': ('miktar', 'sum'),
+            'Toplam Satış Tutarı': ('satis_tutari', 'sum'),
+            'Ortalama Satış Tutarı': ('satis_tutari', 'mean'),
+            'Sipariş Sayısı': ('tarih', 'count')
+        }
+    ).round(2)
+    
+    en_cok_satan = product_details['Toplam Satış Miktarı'].nlargest(10)
+    product_details = product_details.sort_values('Toplam Satış Tutarı', ascending=False)
+    return en_cok_satan, product_details
+
 def analyze_products(df):
     """Ürün bazlı analiz yapar."""
     st.header("🏆 En Çok Satan Ürünler")
@@ -1553,7 +1737,7 @@ def analyze_products(df):
     
     # En çok satan ürünler
     try:
-        en_cok_satan = df.groupby('urun_adi')['miktar'].sum().sort_values(ascending=False).head(10)
+        en_cok_satan, product_details = _product_aggregates(df)
         
         # Bar grafiği
         fig = px.bar(
@@ -1571,25 +1755,31 @@ def analyze_products(df):
         
         # Ürün detayları
         st.subheader("Ürün Detayları")
-        product_details = df.groupby('urun_adi').agg({
-            'miktar': 'sum',
-            'satis_tutari': ['sum', 'mean'],
-            'tarih': 'count'
-        }).round(2)
-        
-        product_details.columns = ['Toplam Satış Miktarı', 'Toplam Satış Tutarı', 'Ortalama Satış Tutarı', 'Sipariş Sayısı']
-        product_details = product_details.sort_values('Toplam Satış Tutarı', ascending=False)
+        # Büyük kataloglarda tablo yalnızca en yüksek cirolu ürünlerle sınırlanır
+        product_details_display = product_details
+        if len(product_details) > 50:
+            product_count = st.slider("Görüntülenecek ürün sayısı", 50, 2000, 200)
+            product_details_display = product_details.head(product_count)
         
+        # Styler her hücreyi Python'da biçimlendirir; biçim ve ilerleme çubuğu tarayıcıda uygulanır
         st.dataframe(
-            product_details.style.format({
-                'Toplam Satış Tutarı': '₺{:,.2f}',
-                'Ortalama Satış Tutarı': '₺{:,.2f}'
-            }).background_gradient(subset=['Toplam Satış Miktarı'], cmap='Blues')
+            product_details_display,
+            use_container_width=True,
+            column_config={
+                'Toplam Satış Miktarı': st.column_config.ProgressColumn(
+                    'Toplam Satış Miktarı',
+                    format='%d',
+                    min_value=0,
+                    max_value=int(product_details['Toplam Satış Miktarı'].max())
+                ),
+                'Toplam Satış Tutarı': st.column_config.NumberColumn(format='₺%.2f'),
+                'Ortalama Satış Tutarı': st.column_config.NumberColumn(format='₺%.2f')
+            }
         )
         
         # En karlı ürünler analizi
         st.subheader("En Yüksek Cirolu Ürünler")
-        en_karli = product_details.sort_values('Toplam Satış Tutarı', ascending=False).head(10)
+        en_karli = product_details.head(10)  # tablo zaten ciroya göre azalan sırada
         
         fig = px.bar(
             en_karli,
@@ -1606,7 +1796,7 @@ def analyze_products(df):
         
         # Ortalama sepet tutarı yüksek olan ürünler
         st.subheader("Yüksek Ortalama Satış Tutarı Olan Ürünler")
-        yuksek_ortalama = product_details[product_details['Sipariş Sayısı'] >= 3].sort_values('Ortalama Satış Tutarı', ascending=False).head(10)
+        yuksek_ortalama = product_details[product_details['Sipariş Sayısı'] >= 3].nlargest(10, 'Ortalama Satış Tutarı')
         
         if not yuksek_ortalama.empty:
             fig = px.bar(
@@ -1628,6 +1818,117 @@ def analyze_products(df):
         st.error(f"Ürün analizi sırasında bir hata oluştu: {str(e)}")
         st.info("Veri formatınızı kontrol edin ve yeniden deneyin.")
 
+# Streamlit 1.33+ parçaları (fragment) bu bölümleri kendi döngülerinde yeniden çalıştırır;
+# eski sürümlerde dekoratör etkisizdir ve bölümler normal akışta çalışır
+_fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda func: func)
+
+@_fragment
+def _forecast_section(filtered_df: pd.DataFrame) -> None:
+    """Tahmin ufku ve tahmin grafiklerini gösterir."""
+    st.header("🔮 Satış Tahmini")
+    
+    forecast_days = st.slider("Tahmin Gün Sayısı", 7, 90, 30)
+    
+    if st.button("Tahmin Oluştur"):
+        with st.spinner("Tahmin hesaplanıyor..."):
+            forecast_results = forecast_sales(_select_columns(filtered_df, FORECAST_COLUMNS), forecast_days)
+            
+            # Prophet tahmin grafiği
+            fig = go.Figure()
+            fig.add_trace(go.Scatter(
+                x=forecast_results['prophet_forecast']['ds'],
+                y=forecast_results['prophet_forecast']['yhat'],
+                name='Prophet Tahmini',
+                line=dict(color='blue')
+            ))
+            fig.add_trace(go.Scatter(
+                x=forecast_results['prophet_forecast']['ds'],
+                y=forecast_results['prophet_forecast']['yhat_lower'],
+                name='Alt Sınır',
+                line=dict(color='gray', dash='dash')
+            ))
+            fig.add_trace(go.Scatter(
+                x=forecast_results['prophet_forecast']['ds'],
+                y=forecast_results['prophet_forecast']['yhat_upper'],
+                name='Üst Sınır',
+                line=dict(color='gray', dash='dash'),
+                fill='tonexty'
+            ))
+            
+            fig.update_layout(
+                title='Satış Tahmini',
+                xaxis_title='Tarih',
+                yaxis_title='Tahmini Satış Tutarı (₺)'
+            )
+            
+            st.plotly_chart(fig, use_container_width=True)
+            
+            # ARIMA tahmin grafiği
+            fig = go.Figure(
+                data=go.Scatter(
+                    x=pd.date_range(start=forecast_results['last_date'], periods=forecast_days),
+                    y=np.asarray(forecast_results['arima_forecast']),
+                    name='ARIMA Tahmini',
+                    line=dict(color='red')
+                ),
+                layout=dict(
+                    title='ARIMA Model Tahmini',
+                    xaxis_title='Tarih',
+                    yaxis_title='Tahmini Satış Tutarı (₺)'
+                )
+            )
+            
+            st.plotly_chart(fig, use_container_width=True)
+
+@_fragment
+def _stock_section(filtered_df: pd.DataFrame) -> None:
+    """Stok optimizasyonu önerilerini gösterir."""
+    st.header("📦 Stok Optimizasyonu")
+    
+    if st.button("Stok Analizi Oluştur"):
+        with st.spinner("Stok analizi hesaplanıyor..."):
+            stock_analysis = optimize_stock(_select_columns(filtered_df, STOCK_COLUMNS))
+            
+            st.subheader("Stok Durumu ve Öneriler")
+            st.dataframe(stock_analysis)
+            
+            # Stok durumu dağılımı
+            stock_status = stock_analysis['Stok Durumu'].value_counts()
+            fig = px.pie(values=stock_status.values,
+                       names=stock_status.index,
+                       title='Stok Durumu Dağılımı')
+            st.plotly_chart(fig, use_container_width=True)
+
+@_fragment
+def _report_section(filtered_df: pd.DataFrame) -> None:
+    """Kapsamlı raporu oluşturur ve indirme bağlantısını gösterir."""
+    st.header("📄 Kapsamlı Rapor")
+    
+    if st.button("Rapor Oluştur", key="create_report"):
+        with st.spinner("Kapsamlı rapor oluşturuluyor..."):
+            # Tahmin ve stok analizi sonuçlarını al
+            forecast_results = forecast_sales(_select_columns(filtered_df, FORECAST_COLUMNS))
+            stock_analysis = optimize_stock(_select_columns(filtered_df, STOCK_COLUMNS))
+            
+            # Rapor oluştur (gün bazında tarih, önbellek anahtarı gün içinde değişmez)
+            report_date = pd.Timestamp.now().normalize()
+            report_html = generate_report(filtered_df, forecast_results, stock_analysis, report_date)
+            
+            # Tam sayfa rapor görüntüleme
+            st.subheader("📊 E-Ticaret Satış Analiz Raporu")
+            st.info("Aşağıda oluşturulan kapsamlı raporu görüntüleyebilirsiniz. Rapor interaktif olup, tablolar arasında geçiş yapabilir ve detaylı analizleri inceleyebilirsiniz.")
+            
+            # HTML'i göster - tam boy (yüksekliği artırdık ve kaydırma özelliğini ekledik)
+            st.components.v1.html(report_html, height=1500, scrolling=True)
+            
+            # PDF indirme linki
+            st.download_button(
+                label="📥 Raporu HTML Olarak İndir",
+                data=report_html.encode(),
+                file_name=f"e_ticaret_raporu_{report_date.strftime('%Y%m%d')}.html",
+                mime="text/html"
+            )
+
 # Ana uygulama
 st.title("📊 E-Ticaret Satış Analizi")
 st.markdown("""
@@ -1659,15 +1960,14 @@ if uploaded_file is not None:
         else:
             st.success(message)
         
-        # Tarih dönüşümü
-        df = detect_and_convert_date(df)
-        
         # Veri önizleme
-        with st.expander("Veri Önizleme", expanded=True):
+        with st.expander("Veri Önizleme", expanded=False):
             st.dataframe(df.head())
             st.write(f"Toplam Satır Sayısı: {len(df)}")
             st.write("Sütun Bilgileri:")
-            st.write(df.dtypes)
+            # dtype nesneleri Arrow'a çevrilemez; metin olarak verilince her yeniden çalıştırmadaki
+            # başarısız dönüşüm denemesi ve düzeltme adımı atlanır
+            st.write(df.dtypes.astype(str))
         
         # Filtreleme seçenekleri
         st.sidebar.header("🔍 Filtreleme Seçenekleri")
@@ -1689,20 +1989,31 @@ if uploaded_file is not None:
         
         # Müşteri segmenti filtresi
         if 'musteri_id' in df.columns:
-            rfm = calculate_rfm(df)
+            rfm = calculate_rfm(_select_columns(df, RFM_COLUMNS))
             segments = ['Tümü'] + sorted(rfm['Segment'].unique().tolist())
             selected_segment = st.sidebar.selectbox("Müşteri Segmenti", segments)
         
         # Filtreleri uygula
-        mask = (df['tarih'].dt.date >= date_range[0]) & (df['tarih'].dt.date <= date_range[1])
-        filtered_df = df.loc[mask]
+        # Tüm koşullar tek maskede birleştirilir, çerçeve yalnızca bir kez kopyalanır
+        # Bitiş günü dahil: üst sınır ertesi günün başlangıcıdır (datetime64 karşılaştırması)
+        tarih_values = df['tarih'].to_numpy()
+        start_bound = np.datetime64(date_range[0], 'D')
+        end_bound = np.datetime64(date_range[1], 'D') + np.timedelta64(1, 'D')
+        mask = (tarih_values >= start_bound) & (tarih_values < end_bound)
         
         if 'kategori' in df.columns and selected_category != 'Tümü':
-            filtered_df = filtered_df[filtered_df['kategori'] == selected_category]
+            mask &= (df['kategori'] == selected_category).to_numpy()
         
         if 'musteri_id' in df.columns and selected_segment != 'Tümü':
             segment_customers = rfm[rfm['Segment'] == selected_segment].index
-            filtered_df = filtered_df[filtered_df['musteri_id'].isin(segment_customers)]
+            mask &= _category_mask(df['musteri_id'], segment_customers)
+        
+        filtered_df = df.loc[mask]
+        
+        # Boş filtrede analiz bölümleri tek tek uyarı üretmek yerine burada durulur
+        if filtered_df.empty:
+            st.warning("Seçilen filtre için veri yok.")
+            st.stop()
         
         # Ana metrikler
         col1, col2, col3 = st.columns(3)
@@ -1731,7 +2042,6 @@ if uploaded_file is not None:
         Bu analiz, satışlarınızın zaman içindeki değişimini gösterir. 
         Günlük, haftalık ve aylık trendleri görerek satışlarınızdaki artış/azalışları takip edebilirsiniz.
         """)
-        analyze_time_series(filtered_df)
         
         # Satış yoğunluğu ısı haritası
         st.subheader("Satış Yoğunluğu")
@@ -1747,7 +2057,7 @@ if uploaded_file is not None:
             """)
             
             # Analiz verilerini al
-            category_data = analyze_categories(filtered_df)
+            category_data = analyze_categories(_select_columns(filtered_df, CATEGORY_ANALYSIS_COLUMNS))
             
             if category_data:
                 # Kategori metrikleri
@@ -1815,8 +2125,11 @@ if uploaded_file is not None:
             """)
             
             try:
-                # RFM analizi yap
-                rfm_data = calculate_rfm(filtered_df)
+                # RFM analizi yap; filtre hiç satır elemediyse kenar çubuğundaki sonuç aynen geçerlidir
+                if len(filtered_df) == len(df):
+                    rfm_data = rfm
+                else:
+                    rfm_data = calculate_rfm(_select_columns(filtered_df, RFM_COLUMNS))
                 
                 # RFM metrikleri
                 col1, col2, col3 = st.columns(3)
@@ -1844,7 +2157,7 @@ if uploaded_file is not None:
                 
                 # Segment detayları
                 st.subheader("Segment Detayları")
-                segment_metrics = rfm_data.groupby('Segment').agg({
+                segment_metrics = rfm_data.groupby('Segment', sort=False).agg({
                     'recency': 'mean',
                     'frequency': 'mean',
                     'monetary': 'mean'
@@ -1875,11 +2188,13 @@ if uploaded_file is not None:
                 segment_customers = segment_customers.sort_values('monetary', ascending=False)
                 
                 st.dataframe(
-                    segment_customers.style.format({
-                        'recency': '{:.0f} gün',
-                        'frequency': '{:.0f}',
-                        'monetary': '₺{:,.2f}'
-                    })
+                    segment_customers,
+                    use_container_width=True,
+                    column_config={
+                        'recency': st.column_config.NumberColumn(format='%.0f gün'),
+                        'frequency': st.column_config.NumberColumn(format='%.0f'),
+                        'monetary': st.column_config.NumberColumn(format='₺%.2f')
+                    }
                 )
                 
                 # Pazarlama önerileri
@@ -1939,107 +2254,16 @@ if uploaded_file is not None:
                 """)
         
         # Ürün Analizi
-        analyze_products(filtered_df)
+        analyze_products(_select_columns(filtered_df, PRODUCT_COLUMNS))
         
         # Tahminleme
-        st.header("🔮 Satış Tahmini")
-        
-        forecast_days = st.slider("Tahmin Gün Sayısı", 7, 90, 30)
-        
-        if st.button("Tahmin Oluştur"):
-            with st.spinner("Tahmin hesaplanıyor..."):
-                forecast_results = forecast_sales(filtered_df, forecast_days)
-                
-                # Prophet tahmin grafiği
-                fig = go.Figure()
-                fig.add_trace(go.Scatter(
-                    x=forecast_results['prophet_forecast']['ds'],
-                    y=forecast_results['prophet_forecast']['yhat'],
-                    name='Prophet Tahmini',
-                    line=dict(color='blue')
-                ))
-                fig.add_trace(go.Scatter(
-                    x=forecast_results['prophet_forecast']['ds'],
-                    y=forecast_results['prophet_forecast']['yhat_lower'],
-                    name='Alt Sınır',
-                    line=dict(color='gray', dash='dash')
-                ))
-                fig.add_trace(go.Scatter(
-                    x=forecast_results['prophet_forecast']['ds'],
-                    y=forecast_results['prophet_forecast']['yhat_upper'],
-                    name='Üst Sınır',
-                    line=dict(color='gray', dash='dash'),
-                    fill='tonexty'
-                ))
-                
-                fig.update_layout(
-                    title='Satış Tahmini',
-                    xaxis_title='Tarih',
-                    yaxis_title='Tahmini Satış Tutarı (₺)'
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
-                
-                # ARIMA tahmin grafiği
-                fig = go.Figure()
-                fig.add_trace(go.Scatter(
-                    x=pd.date_range(start=forecast_results['last_date'], periods=forecast_days),
-                    y=forecast_results['arima_forecast'],
-                    name='ARIMA Tahmini',
-                    line=dict(color='red')
-                ))
-                
-                fig.update_layout(
-                    title='ARIMA Model Tahmini',
-                    xaxis_title='Tarih',
-                    yaxis_title='Tahmini Satış Tutarı (₺)'
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
+        _forecast_section(filtered_df)
         
         # Stok Optimizasyonu
-        st.header("📦 Stok Optimizasyonu")
-        
-        if st.button("Stok Analizi Oluştur"):
-            with st.spinner("Stok analizi hesaplanıyor..."):
-                stock_analysis = optimize_stock(filtered_df)
-                
-                st.subheader("Stok Durumu ve Öneriler")
-                st.dataframe(stock_analysis)
-                
-                # Stok durumu dağılımı
-                stock_status = stock_analysis['Stok Durumu'].value_counts()
-                fig = px.pie(values=stock_status.values,
-                           names=stock_status.index,
-                           title='Stok Durumu Dağılımı')
-                st.plotly_chart(fig, use_container_width=True)
+        _stock_section(filtered_df)
         
         # Rapor Oluşturma
-        st.header("📄 Kapsamlı Rapor")
-        
-        if st.button("Rapor Oluştur", key="create_report"):
-            with st.spinner("Kapsamlı rapor oluşturuluyor..."):
-                # Tahmin ve stok analizi sonuçlarını al
-                forecast_results = forecast_sales(filtered_df)
-                stock_analysis = optimize_stock(filtered_df)
-                
-                # Rapor oluştur
-                report_html = generate_report(filtered_df, forecast_results, stock_analysis)
-                
-                # Tam sayfa rapor görüntüleme
-                st.subheader("📊 E-Ticaret Satış Analiz Raporu")
-                st.info("Aşağıda oluşturulan kapsamlı raporu görüntüleyebilirsiniz. Rapor interaktif olup, tablolar arasında geçiş yapabilir ve detaylı analizleri inceleyebilirsiniz.")
-                
-                # HTML'i göster - tam boy (yüksekliği artırdık ve kaydırma özelliğini ekledik)
-                st.components.v1.html(report_html, height=1500, scrolling=True)
-                
-                # PDF indirme linki
-                st.download_button(
-                    label="📥 Raporu HTML Olarak İndir",
-                    data=report_html.encode(),
-                    file_name=f"e_ticaret_raporu_{pd.Timestamp.now().strftime('%Y%m%d')}.html",
-                    mime="text/html"
-                )
+        _report_section(filtered_df)
         
         # Ham veri görüntüleme
         with st.expander("Ham Veri"):